@@ -5,13 +5,34 @@ This module handles all emission factor calculations and conversions
 from activities to CO2 equivalent emissions.
 """
 import json
-from typing import Dict, Union, Optional
+import sys
+from types import MappingProxyType
+from typing import Dict, Iterable, Mapping, Tuple, Union, Optional
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from src.geo_utils import get_flight_distance_km
+import numpy as np
 
 
-@dataclass
+# Multipliers converting supported energy units to kWh
+ENERGY_UNIT_TO_KWH = {"kwh": 1, "kw": 1, "mwh": 1000}
+
+# Approximate serving sizes in kg
+SERVING_WEIGHTS_KG = {"beef": 0.15, "chicken": 0.12, "milk": 0.25}
+DEFAULT_SERVING_WEIGHT_KG = 0.1
+
+# Locally produced food typically has 10-20% less emissions
+LOCAL_FOOD_DISCOUNT = 0.85
+
+
+@lru_cache(maxsize=4)
+def _read_emission_factors_text(path: str) -> str:
+    """Read the emission factors file once per path and process"""
+    with open(path, 'r') as f:
+        return f.read()
+
+
+@dataclass(slots=True)
 class EmissionResult:
     """Result of an emission calculation"""
     co2_kg: float
@@ -26,19 +47,58 @@ class CarbonCalculator:
     
     def __init__(self, emission_factors_path: str = "data/emission_factors.json"):
         """Initialize calculator with emission factors data"""
-        self.emission_factors = self._load_emission_factors(emission_factors_path)
+        factors = self._load_emission_factors(emission_factors_path)
+        self._flat = self._flatten_emission_factors(factors)
+        # Columnar view of the flat table for the batch path
+        self.factor_array = np.fromiter(self._flat.values(), dtype=np.float64, count=len(self._flat))
+        self._factor_codes = {key: code for code, key in enumerate(self._flat)}
+        self._options = self._build_options(factors)
+        # Read-only view: calculations use the tables above, so edits would be ignored
+        self.emission_factors = self._freeze_factors(factors)
+        self._activity_labels = {
+            key: sys.intern(f"{key[1]}_{key[2]}")
+            for key in self._flat
+            if len(key) == 3 and key[0] in ("transportation", "energy")
+        }
     
     def _load_emission_factors(self, path: str) -> Dict:
         """Load emission factors from JSON file"""
         try:
-            with open(path, 'r') as f:
-                return json.load(f)
+            # Parse per instance so each calculator gets its own dict
+            return json.loads(_read_emission_factors_text(path))
         except FileNotFoundError:
             # Create default emission factors if file doesn't exist
             default_factors = self._create_default_emission_factors()
             self._save_emission_factors(path, default_factors)
             return default_factors
     
+    def _flatten_emission_factors(self, factors: Dict,
+                                  prefix: Tuple[str, ...] = ()) -> Dict[Tuple[str, ...], float]:
+        """Flatten nested emission factors into a (category, ..., item) -> factor table"""
+        flat = {}
+        for key, value in factors.items():
+            if isinstance(value, dict):
+                flat.update(self._flatten_emission_factors(value, prefix + (key,)))
+            else:
+                flat[prefix + (key,)] = value
+        return flat
+    
+    def _build_options(self, factors: Dict,
+                       prefix: Tuple[str, ...] = ()) -> Dict[Tuple[str, ...], Tuple[str, ...]]:
+        """Precompute the tuple of child keys for every level of the factor tree"""
+        options = {prefix: tuple(factors)}
+        for key, value in factors.items():
+            if isinstance(value, dict):
+                options.update(self._build_options(value, prefix + (key,)))
+        return options
+    
+    def _freeze_factors(self, factors: Dict) -> Mapping:
+        """Wrap nested emission factors in read-only mapping proxies"""
+        return MappingProxyType({
+            key: self._freeze_factors(value) if isinstance(value, dict) else value
+            for key, value in factors.items()
+        })
+    
     def _create_default_emission_factors(self) -> Dict:
         """Create default emission factors based on EPA and DEFRA data"""
         return {
@@ -153,170 +213,230 @@ class CarbonCalculator:
         with open(path, 'w') as f:
             json.dump(factors, f, indent=2)
     
+    def _factor_transportation(self, transport_type: str, fuel_type: str) -> float:
+        """Look up the emission factor for a transport type and fuel"""
+        factor = self._flat.get(("transportation", transport_type, fuel_type))
+        if factor is None:
+            raise ValueError(f"Unknown transportation type or fuel: {transport_type}/{fuel_type}")
+        return factor
+    
     def calculate_transportation(
         self, transport_type: str, fuel_type: str,
         distance_km: float, passengers: int = 1,
     ) -> EmissionResult:
         """Calculate emissions from transportation"""
-        try:
-            factor = self.emission_factors["transportation"][transport_type][fuel_type]
-            co2_kg = (factor * distance_km) / passengers         
-            return EmissionResult(
-                co2_kg=round(co2_kg, 3),
-                category="transportation",
-                subcategory=transport_type,
-                activity=f"{transport_type}_{fuel_type}",
-                details={
-                    "distance_km": distance_km,
-                    "fuel_type": fuel_type,
-                    "passengers": passengers,
-                    "emission_factor": factor
-                }
-            )
-        except KeyError as e:
-            raise ValueError(f"Unknown transportation type or fuel: {e}")
+        factor = self._factor_transportation(transport_type, fuel_type)
+        co2_kg = (factor * distance_km) / passengers         
+        return EmissionResult(
+            co2_kg=co2_kg,
+            category="transportation",
+            subcategory=transport_type,
+            activity=self._activity_labels[("transportation", transport_type, fuel_type)],
+            details={
+                "distance_km": distance_km,
+                "fuel_type": fuel_type,
+                "passengers": passengers,
+                "emission_factor": factor
+            }
+        )
+    
+    def _validate_batch_inputs(self, amounts: np.ndarray,
+                               passengers: Optional[np.ndarray] = None):
+        """Reject NaN or negative amounts and NaN or sub-1 passenger counts"""
+        if np.isnan(amounts).any() or (amounts < 0).any():
+            raise ValueError("Amounts must be non-negative numbers")
+        if passengers is not None and (np.isnan(passengers).any() or (passengers < 1).any()):
+            raise ValueError("Passengers must be at least 1")
+    
+    def calculate_transportation_batch(
+        self, transport_type: str, fuel_type: str,
+        distances_km, passengers=1,
+    ) -> np.ndarray:
+        """Calculate emissions for many trips of the same transport type"""
+        factor = self._factor_transportation(transport_type, fuel_type)
+        distances_km = np.asarray(distances_km, dtype=np.float64)
+        passengers = np.asarray(passengers, dtype=np.float64)
+        self._validate_batch_inputs(distances_km, passengers)
+        
+        return factor * distances_km / passengers
     
     def calculate_energy(self, energy_type: str, source: str, 
                         amount: float, unit: str = "kwh") -> EmissionResult:
         """Calculate emissions from energy consumption"""
-        try:
-            factor = self.emission_factors["energy"][energy_type][source]
-            
-            # Convert units if necessary
-            if unit.lower() == "mwh":
-                amount *= 1000  # Convert MWh to kWh
-            elif unit.lower() not in ["kwh", "kw"]:
-                raise ValueError(f"Unsupported energy unit: {unit}")
-            
-            co2_kg = factor * amount
-            
-            return EmissionResult(
-                co2_kg=round(co2_kg, 3),
-                category="energy",
-                subcategory=energy_type,
-                activity=f"{energy_type}_{source}",
-                details={
-                    "amount": amount,
-                    "unit": unit,
-                    "source": source,
-                    "emission_factor": factor
-                }
-            )
-        except KeyError as e:
-            raise ValueError(f"Unknown energy type or source: {e}")
+        factor = self._flat.get(("energy", energy_type, source))
+        if factor is None:
+            raise ValueError(f"Unknown energy type or source: {energy_type}/{source}")
+        
+        # Convert units if necessary
+        unit_multiplier = ENERGY_UNIT_TO_KWH.get(unit.lower())
+        if unit_multiplier is None:
+            raise ValueError(f"Unsupported energy unit: {unit}")
+        amount *= unit_multiplier
+        
+        co2_kg = factor * amount
+        
+        return EmissionResult(
+            co2_kg=co2_kg,
+            category="energy",
+            subcategory=energy_type,
+            activity=self._activity_labels[("energy", energy_type, source)],
+            details={
+                "amount": amount,
+                "unit": unit,
+                "source": source,
+                "emission_factor": factor
+            }
+        )
     
     def calculate_food(self, food_type: str, food_item: str, 
                       amount: float, unit: str = "kg", local: bool = False) -> EmissionResult:
         """Calculate emissions from food consumption"""
-        try:
-            factor = self.emission_factors["food"][food_type][food_item]
-            
-            # Convert units if necessary
-            if unit.lower() == "g":
-                amount /= 1000  # Convert grams to kg
-            elif unit.lower() == "servings":
-                # Approximate serving sizes
-                serving_weights = {"beef": 0.15, "chicken": 0.12, "milk": 0.25}
-                amount *= serving_weights.get(food_item, 0.1)
-            
-            # Apply local food discount (typically 10-20% less emissions)
-            if local:
-                factor *= 0.85
-            
-            co2_kg = factor * amount
-            
-            return EmissionResult(
-                co2_kg=round(co2_kg, 3),
-                category="food",
-                subcategory=food_type,
-                activity=food_item,
-                details={
-                    "amount": amount,
-                    "unit": unit,
-                    "local": local,
-                    "emission_factor": factor
-                }
-            )
-        except KeyError as e:
-            raise ValueError(f"Unknown food type or item: {e}")
+        factor = self._flat.get(("food", food_type, food_item))
+        if factor is None:
+            raise ValueError(f"Unknown food type or item: {food_type}/{food_item}")
+        
+        # Convert units if necessary
+        unit_key = unit.lower()
+        if unit_key == "g":
+            amount /= 1000  # Convert grams to kg
+        elif unit_key == "servings":
+            amount *= SERVING_WEIGHTS_KG.get(food_item, DEFAULT_SERVING_WEIGHT_KG)
+        
+        # Apply local food discount (typically 10-20% less emissions)
+        if local:
+            factor *= LOCAL_FOOD_DISCOUNT
+        
+        co2_kg = factor * amount
+        
+        return EmissionResult(
+            co2_kg=co2_kg,
+            category="food",
+            subcategory=food_type,
+            activity=food_item,
+            details={
+                "amount": amount,
+                "unit": unit,
+                "local": local,
+                "emission_factor": factor
+            }
+        )
     
     def calculate_consumption(self, item_type: str, item: str, 
                             quantity: int = 1, lifetime_years: Optional[float] = None) -> EmissionResult:
         """Calculate emissions from consumption/purchases"""
-        try:
-            factor = self.emission_factors["consumption"][item_type][item]
-            
-            # If lifetime is provided, amortise emissions over the lifetime
-            if lifetime_years:
-                factor /= lifetime_years
-            
-            co2_kg = factor * quantity
-            
-            return EmissionResult(
-                co2_kg=round(co2_kg, 3),
-                category="consumption",
-                subcategory=item_type,
-                activity=item,
-                details={
-                    "quantity": quantity,
-                    "lifetime_years": lifetime_years,
-                    "emission_factor": factor
-                }
-            )
-        except KeyError as e:
-            raise ValueError(f"Unknown consumption item: {e}")
+        factor = self._flat.get(("consumption", item_type, item))
+        if factor is None:
+            raise ValueError(f"Unknown consumption item: {item_type}/{item}")
+        
+        # If lifetime is provided, amortise emissions over the lifetime
+        if lifetime_years:
+            factor /= lifetime_years
+        
+        co2_kg = factor * quantity
+        
+        return EmissionResult(
+            co2_kg=co2_kg,
+            category="consumption",
+            subcategory=item_type,
+            activity=item,
+            details={
+                "quantity": quantity,
+                "lifetime_years": lifetime_years,
+                "emission_factor": factor
+            }
+        )
     
     def calculate_waste(self, disposal_method: str, amount_kg: float) -> EmissionResult:
         """Calculate emissions from waste disposal"""
+        factor = self._flat.get(("waste", disposal_method))
+        if factor is None:
+            raise ValueError(f"Unknown waste disposal method: {disposal_method}")
+        
+        co2_kg = factor * amount_kg
+        
+        return EmissionResult(
+            co2_kg=co2_kg,
+            category="waste",
+            subcategory=disposal_method,
+            activity=disposal_method,
+            details={
+                "amount_kg": amount_kg,
+                "disposal_method": disposal_method,
+                "emission_factor": factor
+            }
+        )
+    
+    def get_factors(self, keys: Iterable[Tuple[str, ...]]) -> np.ndarray:
+        """Look up emission factors for many (category, ..., item) keys at once"""
         try:
-            factor = self.emission_factors["waste"][disposal_method]
-            co2_kg = factor * amount_kg
-            
-            return EmissionResult(
-                co2_kg=round(co2_kg, 3),
-                category="waste",
-                subcategory=disposal_method,
-                activity=disposal_method,
-                details={
-                    "amount_kg": amount_kg,
-                    "disposal_method": disposal_method,
-                    "emission_factor": factor
-                }
-            )
+            return np.fromiter((self._flat[key] for key in keys), dtype=np.float64)
         except KeyError as e:
-            raise ValueError(f"Unknown waste disposal method: {e}")
+            raise ValueError(f"Unknown emission factor: {e}")
     
-    def get_category_factors(self, category: str) -> Dict:
-        """Get all emission factors for a specific category"""
-        return self.emission_factors.get(category, {})
+    def get_factor_codes(self, keys: Iterable[Tuple[str, ...]]) -> np.ndarray:
+        """Encode (category, ..., item) keys as integer indices into factor_array"""
+        try:
+            return np.fromiter((self._factor_codes[key] for key in keys), dtype=np.intp)
+        except KeyError as e:
+            raise ValueError(f"Unknown emission factor: {e}")
+    
+    def calculate_many(self, amounts, factors,
+                       passengers=None) -> np.ndarray:
+        """Calculate emissions in bulk as factors * amounts / passengers"""
+        amounts = np.asarray(amounts, dtype=np.float64)
+        factors = np.asarray(factors, dtype=np.float64)
+        if amounts.shape != factors.shape:
+            raise ValueError("amounts and factors must have the same shape")
+        if passengers is not None:
+            passengers = np.asarray(passengers, dtype=np.float64)
+        self._validate_batch_inputs(amounts, passengers)
+        
+        co2_kg = factors * amounts
+        if passengers is not None:
+            co2_kg /= passengers
+        return co2_kg
+    
+    def get_options(self, *path: str) -> Tuple[str, ...]:
+        """Get the available keys below a path, e.g. get_options("food", "meat")"""
+        return self._options.get(path, ())
+    
+    def get_category_factors(self, category: str) -> Mapping:
+        """Get a read-only view of the emission factors for a specific category"""
+        return self.emission_factors.get(category, MappingProxyType({}))
         
     def estimate_flight_distance(self, origin: str, destination: str) -> float:
+        # Imported lazily so geocoding deps only load when flights are estimated
+        from src.geo_utils import get_flight_distance_km
         return get_flight_distance_km(origin, destination)
-            
 
 
+@lru_cache(maxsize=None)
+def get_calculator(emission_factors_path: str = "data/emission_factors.json") -> CarbonCalculator:
+    """Return a shared calculator instance, created on first use"""
+    return CarbonCalculator(emission_factors_path)
+
 
 # Example usage and testing functions
 if __name__ == "__main__":
     # Initialize calculator
-    calc = CarbonCalculator()
+    calc = get_calculator()
     
     # Test transportation calculation
     car_trip = calc.calculate_transportation("car", "petrol", 50.0)
-    print(f"Car trip: {car_trip.co2_kg} kg CO2")
+    print(f"Car trip: {car_trip.co2_kg:.3f} kg CO2")
     
     # Test energy calculation
     electricity = calc.calculate_energy("electricity", "grid_average", 300.0)
-    print(f"Electricity: {electricity.co2_kg} kg CO2")
+    print(f"Electricity: {electricity.co2_kg:.3f} kg CO2")
     
     # Test food calculation
     beef_meal = calc.calculate_food("meat", "beef", 0.2, "kg")
-    print(f"Beef meal: {beef_meal.co2_kg} kg CO2")
+    print(f"Beef meal: {beef_meal.co2_kg:.3f} kg CO2")
     
     # Test consumption calculation
     smartphone = calc.calculate_consumption("electronics", "smartphone", 1, 3.0)
-    print(f"Smartphone (amortized): {smartphone.co2_kg} kg CO2")
+    print(f"Smartphone (amortized): {smartphone.co2_kg:.3f} kg CO2")
     
     # Test waste calculation
     waste = calc.calculate_waste("landfill", 5.0)
-    print(f"Waste: {waste.co2_kg} kg CO2")
\ No newline at end of file
+    print(f"Waste: {waste.co2_kg:.3f} kg CO2")
\ No newline at end of file
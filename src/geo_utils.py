@@ -1,19 +1,39 @@
-import streamlit as st
-import openrouteservice
+import math
+import numpy as np
+from functools import lru_cache
 from geopy.geocoders import Nominatim
 
 
-client = openrouteservice.Client(key=st.secrets["ORS_API_KEY"])
-geolocator = Nominatim(user_agent="carbon-tracker")
+EARTH_RADIUS_KM = 6371.0088
 
-def geocode_city(city_name: str) -> list[float]:
-    location = geolocator.geocode(city_name)
+@lru_cache(maxsize=1)
+def _geolocator() -> Nominatim:
+    return Nominatim(user_agent="carbon-tracker")
+
+@lru_cache(maxsize=4096)
+def geocode_city(city_name: str) -> tuple[float, float]:
+    location = _geolocator().geocode(city_name)
     if not location:
         raise ValueError(f"Could not geocode location: {city_name}")
-    return [location.longitude, location.latitude]
+    return (location.longitude, location.latitude)
+
+def _haversine_km(lon1: float, lat1: float, lon2: float, lat2: float) -> float:
+    lon1, lat1, lon2, lat2 = map(math.radians, (lon1, lat1, lon2, lat2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+def haversine_km_batch(lon1, lat1, lon2, lat2) -> np.ndarray:
+    lon1, lat1, lon2, lat2 = (np.radians(np.asarray(x, dtype=np.float64)) for x in (lon1, lat1, lon2, lat2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
 
 def get_flight_distance_km(origin: str, destination: str) -> float:
-    coords = [geocode_city(origin), geocode_city(destination)]
-    response = client.directions(coords, profile='driving-car', format='geojson')
-    distance_m = response["features"][0]["properties"]["segments"][0]["distance"]
-    return distance_m / 1000 
+    return _cached_flight_distance_km(origin.strip().lower(), destination.strip().lower())
+
+@lru_cache(maxsize=4096)
+def _cached_flight_distance_km(origin: str, destination: str) -> float:
+    lon1, lat1 = geocode_city(origin)
+    lon2, lat2 = geocode_city(destination)
+    return _haversine_km(lon1, lat1, lon2, lat2)
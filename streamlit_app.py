@@ -1,8 +1,9 @@
+import numpy as np
 import streamlit as st
-from src.calculator import CarbonCalculator
+from src.calculator import get_calculator
 
-# Initialize calculator
-calc = CarbonCalculator()
+# Shared process-wide calculator, reused across reruns
+calc = get_calculator()
 
 st.title("🌍 Carbon Footprint Calculator")
 
@@ -11,6 +12,7 @@ activity_type = st.selectbox("Select an activity category", ["Transportation", "
 if activity_type == "Transportation":
     st.header("🚗 Transportation")
     transport_type = st.selectbox("Type of transport", ["car", "motorcycle", "public_transport"])
+    # Kept outside the form: the CSV upload below also reads the current fuel
     if transport_type == "car":
         fuel = st.selectbox("Fuel type", ["petrol", "diesel", "hybrid", "electric"])
     elif transport_type == "motorcycle":
@@ -18,35 +20,56 @@ if activity_type == "Transportation":
     else:
         fuel = st.selectbox("Mode", ["bus", "train", "subway", "tram"])
     
-    distance = st.number_input("Distance (km)", min_value=0.0)
-    passengers = st.number_input("Number of passengers", min_value=1, value=1)
+    # Inputs inside the form only trigger a rerun when it is submitted
+    with st.form("transportation_form"):
+        distance = st.number_input("Distance (km)", min_value=0.0)
+        passengers = st.number_input("Number of passengers", min_value=1, value=1)
+        submitted = st.form_submit_button("Calculate transportation impact")
     
-    if st.button("Calculate transportation impact"):
+    if submitted:
         result = calc.calculate_transportation(transport_type, fuel, distance, passengers)
-        st.success(f"Estimated CO₂ emissions: {result.co2_kg} kg")
+        st.success(f"Estimated CO₂ emissions: {result.co2_kg:.3f} kg")
         st.json(result.details)
+    
+    trips_csv = st.file_uploader("Or upload a CSV of trips (columns: distance_km, passengers)", type="csv")
+    if trips_csv is not None and trips_csv.size == 0:
+        st.error("Could not read trips CSV: the file is empty")
+    elif trips_csv is not None:
+        try:
+            trips = np.atleast_1d(np.genfromtxt(trips_csv, delimiter=",", names=True))
+            emissions = calc.calculate_transportation_batch(
+                transport_type, fuel, trips["distance_km"], trips["passengers"]
+            )
+        except (ValueError, IndexError) as e:
+            st.error(f"Could not read trips CSV: {e}")
+        else:
+            st.success(f"Estimated CO₂ emissions for {len(emissions)} trips: {emissions.sum():.3f} kg")
 
 elif activity_type == "Energy":
     st.header("⚡ Energy Use")
     energy_type = st.selectbox("Type", ["electricity", "heating", "cooling"])
-    source = st.selectbox("Source", list(calc.get_category_factors("energy")[energy_type].keys()))
-    amount = st.number_input("Consumption amount", min_value=0.0)
-    unit = st.selectbox("Unit", ["kWh", "MWh"])
+    with st.form("energy_form"):
+        source = st.selectbox("Source", calc.get_options("energy", energy_type))
+        amount = st.number_input("Consumption amount", min_value=0.0)
+        unit = st.selectbox("Unit", ["kWh", "MWh"])
+        submitted = st.form_submit_button("Calculate energy impact")
     
-    if st.button("Calculate energy impact"):
+    if submitted:
         result = calc.calculate_energy(energy_type, source, amount, unit)
-        st.success(f"Estimated CO₂ emissions: {result.co2_kg} kg")
+        st.success(f"Estimated CO₂ emissions: {result.co2_kg:.3f} kg")
         st.json(result.details)
 
 elif activity_type == "Food":
     st.header("🫘🍅🫑 Food")
-    food_type = st.selectbox("Category", list(calc.get_category_factors("food").keys()))
-    food_item = st.selectbox("Item", list(calc.get_category_factors("food")[food_type].keys()))
-    amount = st.number_input("Amount", min_value=0.0)
-    unit = st.selectbox("Unit", ["kg", "g", "servings"])
-    local = st.checkbox("Is this locally produced?", value=False)
+    food_type = st.selectbox("Category", calc.get_options("food"))
+    with st.form("food_form"):
+        food_item = st.selectbox("Item", calc.get_options("food", food_type))
+        amount = st.number_input("Amount", min_value=0.0)
+        unit = st.selectbox("Unit", ["kg", "g", "servings"])
+        local = st.checkbox("Is this locally produced?", value=False)
+        submitted = st.form_submit_button("Calculate food impact")
     
-    if st.button("Calculate food impact"):
+    if submitted:
         result = calc.calculate_food(food_type, food_item, amount, unit, local)
-        st.success(f"Estimated CO₂ emissions: {result.co2_kg} kg")
+        st.success(f"Estimated CO₂ emissions: {result.co2_kg:.3f} kg")
         st.json(result.details)
@@ -3,10 +3,10 @@ Unit tests for CarbonCalculator using pytest
 
 """
 import pytest
-from carbon_tracker.src.calculator import CarbonCalculator, EmissionResult
+from src.calculator import CarbonCalculator, EmissionResult, get_calculator
 from unittest.mock import patch, MagicMock
 
-@patch("src.calculator.get_flight_distance_km")
+@patch("src.geo_utils.get_flight_distance_km")
 def test_estimate_flight_distance(mock_distance_func):
     mock_distance_func.return_value = 1200.0
 
@@ -16,9 +16,9 @@ def test_estimate_flight_distance(mock_distance_func):
     assert distance == 1200.0
     mock_distance_func.assert_called_once_with("Berlin", "Madrid")
 
-@pytest.fixture(scope="module")
+@pytest.fixture(scope="session")
 def calculator():
-    """Initialise the calculator once per test module"""
+    """Initialise the calculator once per test session"""
     return CarbonCalculator()
 
 
@@ -86,3 +86,93 @@ def test_waste_invalid_method(calculator):
     with pytest.raises(ValueError):
         calculator.calculate_waste("catapult", 3.0)
 
+
+
+def test_calculate_many_matches_scalar(calculator):
+    keys = [("transportation", "car", "petrol"), ("transportation", "public_transport", "bus")]
+    factors = calculator.get_factors(keys)
+    result = calculator.calculate_many([100, 40], factors, passengers=[2, 1])
+    assert result[0] == pytest.approx(calculator.calculate_transportation("car", "petrol", 100, 2).co2_kg, 0.01)
+    assert result[1] == pytest.approx(0.089 * 40, 0.01)
+
+
+def test_get_factors_invalid_key(calculator):
+    with pytest.raises(ValueError):
+        calculator.get_factors([("waste", "catapult")])
+
+
+def test_get_calculator_is_shared():
+    assert get_calculator() is get_calculator()
+
+
+def test_factor_codes_index_factor_array(calculator):
+    keys = [("waste", "landfill"), ("food", "meat", "beef"), ("waste", "landfill")]
+    codes = calculator.get_factor_codes(keys)
+    assert list(calculator.factor_array[codes]) == list(calculator.get_factors(keys))
+
+
+def test_emission_result_uses_slots(calculator):
+    result = calculator.calculate_waste("recycling", amount_kg=2)
+    assert not hasattr(result, "__dict__")
+
+
+def test_activity_labels(calculator):
+    assert calculator.calculate_transportation("car", "diesel", 10).activity == "car_diesel"
+    assert calculator.calculate_energy("heating", "propane", 10).activity == "heating_propane"
+
+
+def test_transportation_batch_matches_scalar(calculator):
+    result = calculator.calculate_transportation_batch("car", "hybrid", [10, 250], [1, 4])
+    assert result[0] == pytest.approx(calculator.calculate_transportation("car", "hybrid", 10).co2_kg)
+    assert result[1] == pytest.approx(calculator.calculate_transportation("car", "hybrid", 250, 4).co2_kg)
+
+
+def test_transportation_batch_invalid_type(calculator):
+    with pytest.raises(ValueError):
+        calculator.calculate_transportation_batch("hoverboard", "plasma", [50])
+
+
+def test_get_options(calculator):
+    assert calculator.get_options("food") == ("meat", "dairy", "seafood", "plant_based", "processed")
+    assert "grid_average" in calculator.get_options("energy", "electricity")
+    assert calculator.get_options("food", "unicorn") == ()
+
+
+def test_results_keep_full_precision(calculator):
+    result = calculator.calculate_transportation("car", "petrol", 1, passengers=3)
+    assert result.co2_kg == 0.404 / 3
+
+
+def test_emission_factors_are_read_only(calculator):
+    with pytest.raises(TypeError):
+        calculator.get_category_factors("food")["meat"]["beef"] = 0
+    assert calculator.calculate_food("meat", "beef", 1).co2_kg == pytest.approx(27.0)
+
+
+def test_custom_factors_with_two_level_transport_entry(tmp_path):
+    path = tmp_path / "factors.json"
+    path.write_text('{"transportation": {"walking": 0.0, "car": {"petrol": 0.404}}}')
+    calc = CarbonCalculator(str(path))
+    assert calc.calculate_transportation("car", "petrol", 10).activity == "car_petrol"
+
+
+@pytest.mark.parametrize("distances, passengers", [
+    ([10, 20], [1, 0]),
+    ([10, 20], [1, float("nan")]),
+    ([10, float("nan")], [1, 1]),
+    ([10, -5], [1, 1]),
+])
+def test_transportation_batch_rejects_invalid_trips(calculator, distances, passengers):
+    with pytest.raises(ValueError):
+        calculator.calculate_transportation_batch("car", "petrol", distances, passengers)
+
+
+@pytest.mark.parametrize("amounts, passengers", [
+    ([10, 20], [1, 0]),
+    ([10, 20], [1, float("nan")]),
+    ([10, float("nan")], None),
+    ([10, -5], None),
+])
+def test_calculate_many_rejects_invalid_inputs(calculator, amounts, passengers):
+    with pytest.raises(ValueError):
+        calculator.calculate_many(amounts, [0.404, 0.404], passengers=passengers)
@@ -1,17 +1,35 @@
+import pytest
 from unittest.mock import patch
 from src import geo_utils
 
-@patch("src.geo_utils.client.directions")
 @patch("src.geo_utils.geocode_city")
-def test_get_flight_distance_km(mock_geocode, mock_directions):
+def test_get_flight_distance_km(mock_geocode):
+    geo_utils._cached_flight_distance_km.cache_clear()
     mock_geocode.side_effect = [[13.405, 52.52], [-3.703, 40.416]]  # Berlin → Madrid
-    mock_directions.return_value = {
-        "features": [{
-            "properties": {
-                "segments": [{"distance": 2000000}]  # 2000 km
-            }
-        }]
-    }
 
     dist = geo_utils.get_flight_distance_km("Berlin", "Madrid")
-    assert dist == 2000.0
\ No newline at end of file
+    assert dist == pytest.approx(1869, abs=5)
+
+
+def test_haversine_same_point_is_zero():
+    assert geo_utils._haversine_km(13.405, 52.52, 13.405, 52.52) == 0.0
+
+
+@patch("src.geo_utils.geocode_city")
+def test_get_flight_distance_km_is_cached(mock_geocode):
+    geo_utils._cached_flight_distance_km.cache_clear()
+    mock_geocode.side_effect = [[-0.454, 51.470], [-73.779, 40.640]]  # LHR → JFK
+
+    first = geo_utils.get_flight_distance_km("LHR", "JFK")
+    second = geo_utils.get_flight_distance_km(" lhr ", "jfk")
+    assert first == second
+    assert mock_geocode.call_count == 2
+
+
+def test_haversine_batch_matches_scalar():
+    lon1, lat1 = [13.405, -0.454], [52.52, 51.470]
+    lon2, lat2 = [-3.703, -73.779], [40.416, 40.640]
+
+    distances = geo_utils.haversine_km_batch(lon1, lat1, lon2, lat2)
+    for i in range(2):
+        assert distances[i] == pytest.approx(geo_utils._haversine_km(lon1[i], lat1[i], lon2[i], lat2[i]))